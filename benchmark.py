@@ -0,0 +1,567 @@
+"""
+Load-testing and benchmark harness.
+
+Runs the real API and crew pipeline against a deterministic fake LLM and fake search tool,
+so throughput can be measured without Gemini, Serper or Postgres.
+
+    python benchmark.py                                  # sqlite in a temp dir, 20 jobs
+    python benchmark.py --jobs 100 --pages 1,20,100 --llm-latency 0.05
+    python benchmark.py --database-url postgresql://...  # against a local postgres
+    python benchmark.py --json bench_output.json         # machine readable report
+    python benchmark.py --mode direct                    # structured-output fast path, compare with --mode crew
+    python benchmark.py --clients 16                     # 16 clients submitting and polling at once
+    python benchmark.py --serialization                  # job list encoding microbenchmark, 1k and 10k jobs
+
+Reports jobs/sec, p50/p99 latency per endpoint and per pipeline stage, LLM calls and
+estimated tokens per job, and memory.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Type, get_origin
+
+from pydantic import BaseModel
+from crewai.llms.base_llm import BaseLLM
+from langchain_core.messages import AIMessage
+from crewai.tools import BaseTool
+
+
+STAGES = ["verification", "financial_analysis", "investment_analysis", "risk_assessment"]
+
+
+class LLMMeter:
+    """LLM calls and estimated tokens (4 chars per token) per document, across all fakes"""
+
+    def __init__(self):
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.tokens: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, file_path: str, prompt: str, completion: str) -> Dict[str, int]:
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(completion) // 4}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        with self._lock:
+            self.calls[file_path] += 1
+            self.tokens[file_path] += usage["total_tokens"]
+        return usage
+
+
+meter = LLMMeter()
+
+
+def _file_path_in(text: str) -> str:
+    match = re.search(r"(\S+\.pdf)", text)
+    return match.group(1) if match else ""
+
+
+# Fake LLM + tools
+
+def fake_output(model: Type[BaseModel]) -> str:
+    """Deterministic JSON that validates against one of the task output schemas"""
+    data = {}
+    for name, field in model.model_fields.items():
+        if field.annotation is bool:
+            data[name] = True
+        elif get_origin(field.annotation) is list:
+            data[name] = [f"Synthetic {name} {i}" for i in range(1, 4)]
+        else:
+            data[name] = f"Synthetic {name}"
+    return model(**data).model_dump_json()
+
+
+class FakeLLM(BaseLLM):
+    """
+    Scripted ReAct responses for one agent.
+    Emits one Action per tool in `tool_script`, then a Final Answer matching `output_model`.
+    Progress is tracked per file path so concurrent jobs don't interfere.
+    """
+
+    def __init__(self, output_model: Type[BaseModel], tool_script: List[str],
+                 latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        super().__init__(model=f"fake-{output_model.__name__}", temperature=0)
+        self.output_model = output_model
+        self.final_answer = fake_output(output_model)
+        self.tool_script = tool_script
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._steps: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None) -> str:
+        text = messages if isinstance(messages, str) else "\n".join(
+            str(m.get("content", "")) for m in messages
+        )
+        file_path = _file_path_in(text)
+
+        with self._lock:
+            step = self._steps[file_path]
+            self._steps[file_path] += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+
+        if step < len(self.tool_script):
+            tool_name = self.tool_script[step]
+            tool_input = (
+                {"path": file_path} if tool_name == "Financial Document Reader"
+                else {"search_query": "industry outlook"}
+            )
+            answer = (
+                f"Thought: I should use the {tool_name} tool.\n"
+                f"Action: {tool_name}\n"
+                f"Action Input: {json.dumps(tool_input)}"
+            )
+        else:
+            with self._lock:
+                self._steps.pop(file_path, None)
+            answer = f"Thought: I now know the final answer\nFinal Answer: {self.final_answer}"
+
+        meter.add(file_path, text, answer)
+        return answer
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return 1_000_000
+
+
+class FakeJSONChatModel:
+    """
+    Stands in for agents.get_json_llm() on the direct path.
+    Answers with the schema named in the prompt, or with broken JSON `failure_rate` of the time
+    so the agent fallback gets exercised.
+    """
+
+    def __init__(self, output_models: List[Type[BaseModel]], latency: float = 0.0,
+                 jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.answers = {model.__name__: fake_output(model) for model in output_models}
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke(self, messages) -> AIMessage:
+        text = "\n".join(str(m.content) for m in messages)
+        with self._lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.failure_rate
+        time.sleep(delay)
+
+        name = next(name for name in self.answers if name in text)
+        answer = '{"truncated": ' if fail else self.answers[name]
+        usage = meter.add(_file_path_in(text), text, answer)
+        return AIMessage(content=answer, usage_metadata=usage)
+
+
+class FakeSearchTool(BaseTool):
+    """Stands in for SerperDevTool, returns canned results after `latency` seconds"""
+    name: str = "Search the internet with Serper"
+    description: str = "Search the internet for industry context. Args: search_query"
+    latency: float = 0.0
+
+    def _run(self, search_query: str) -> str:
+        time.sleep(self.latency)
+        return json.dumps({"organic": [
+            {"title": f"Result {i} for {search_query}", "snippet": "Synthetic market commentary."}
+            for i in range(1, 4)
+        ]})
+
+
+def install_fakes(llm_latency: float, llm_jitter: float, search_latency: float, direct_failure_rate: float):
+    """Point every agent, task and the direct path at the fakes"""
+    import agents
+    import task
+    from tools import read_data_tool
+
+    fake_search = FakeSearchTool(latency=search_latency)
+    # the factories read these module globals each time they build a job's agents and tasks
+    agents.search_tool = fake_search
+    task.search_tool = fake_search
+
+    reader = read_data_tool.name
+    plan = [
+        ("create_verifier", task.Document_Verification_Output, [reader]),
+        ("create_financial_analyst", task.Financial_Analysis_Output, [reader, fake_search.name]),
+        ("create_investment_advisor", task.Investment_Analysis_Output, [reader]),
+        ("create_risk_assessor", task.Risk_Assessment_Output, [reader]),
+    ]
+    for seed, (factory_name, output_model, script) in enumerate(plan):
+        fake_llm = FakeLLM(output_model, script, llm_latency, llm_jitter, seed=seed)
+        # task.create_tasks() calls the agent factories through task's namespace
+        setattr(task, factory_name, _with_fake_llm(getattr(task, factory_name), fake_llm))
+
+    agents._json_llm = FakeJSONChatModel(
+        [task.Document_Verification_Output, task.Risk_Assessment_Output],
+        llm_latency, llm_jitter, direct_failure_rate, seed=len(plan),
+    )
+
+
+def _with_fake_llm(factory, fake_llm: FakeLLM):
+    def create():
+        agent = factory()
+        agent.llm = fake_llm
+        # the real agents are capped at 10 rpm, which would dominate any measurement
+        agent.max_rpm = None
+        agent._rpm_controller = None
+        return agent
+    return create
+
+
+# Synthetic documents
+
+def make_synthetic_pdf(path: str, pages: int, lines_per_page: int = 50) -> str:
+    """Writes a plain-text PDF of financial-looking lines, no extra dependencies needed"""
+    rng = random.Random(pages)
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: (f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] "
+            f"/Count {pages} >>").encode(),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for n, pid in enumerate(page_ids):
+        lines = [
+            f"Q{n % 4 + 1} segment {j}: revenue ${rng.randint(100, 9999)}M, "
+            f"operating margin {rng.uniform(2, 30):.1f}%, net debt ${rng.randint(10, 900)}M"
+            for j in range(lines_per_page)
+        ]
+        stream = ("BT /F1 9 Tf 40 770 Td 14 TL " + " ".join(f"({line}) '" for line in lines) + " ET").encode()
+        objects[pid] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pid + 1} 0 R >>"
+        ).encode()
+        objects[pid + 1] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, objects[num])
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for num in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[num]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+# Measurement
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.samples[name].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {name: summarize(values) for name, values in sorted(self.samples.items())}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "mean_ms": round(statistics.fmean(values) * 1000, 2),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2),
+    }
+
+
+def timed(recorder: Recorder, name: str, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    recorder.add(name, time.perf_counter() - start)
+    return result
+
+
+# Benchmark run
+
+def run_benchmark(args) -> dict:
+    import main
+    from fastapi.testclient import TestClient
+
+    install_fakes(args.llm_latency, args.llm_jitter, args.search_latency, args.direct_failure_rate)
+
+    endpoints, stages = Recorder(), Recorder()
+
+    # per-stage timing: the crew reports each finished task in order
+    original_run_crew = main.run_crew
+
+    def timed_run_crew(query: str, file_path: str, task_callback=None) -> dict:
+        marks = [time.perf_counter()]
+        outputs = original_run_crew(query, file_path, task_callback=lambda _: marks.append(time.perf_counter()))
+        for stage, (begin, end) in zip(STAGES, zip(marks, marks[1:])):
+            stages.add(stage, end - begin)
+        return outputs
+
+    main.run_crew = timed_run_crew
+
+    # the scheduler picks up the worker function when the app starts, so wrap it first
+    original_process_document_background = main.process_document_background
+
+    def timed_process_document_background(**kwargs):
+        timed(stages, "pipeline_total", original_process_document_background, **kwargs)
+
+    main.process_document_background = timed_process_document_background
+
+    pdf_dir = os.path.join(args.workdir, "pdfs")
+    os.makedirs(pdf_dir, exist_ok=True)
+    page_sizes = [int(p) for p in args.pages.split(",")]
+    documents = [make_synthetic_pdf(os.path.join(pdf_dir, f"synthetic_{p}p.pdf"), p) for p in page_sizes]
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    with TestClient(main.app) as client:
+        user_ids = []
+        for i in range(args.users):
+            response = timed(endpoints, "POST /users", client.post, "/users", json={
+                "email": f"bench{i}_{random.getrandbits(32)}@example.com",
+                "name": f"Bench User {i}",
+                "password": "benchmark-password",
+            })
+            user_ids.append(response.json()["id"])
+
+        def submit(i: int) -> str:
+            path = documents[i % len(documents)]
+            with open(path, "rb") as f:
+                response = timed(endpoints, "POST /analyze", client.post, "/analyze",
+                    files={"file": (os.path.basename(path), f, "application/pdf")},
+                    data={"query": "Summarize revenue and risks", "user_id": user_ids[i % len(user_ids)]},
+                )
+            response.raise_for_status()
+            return response.json()["job_id"]
+
+        def poll(job_id: str):
+            # like a client would, until the job is finished
+            while True:
+                response = timed(endpoints, "GET /jobs/{job_id}", client.get, f"/jobs/{job_id}")
+                if response.json()["status"] in ("completed", "failed"):
+                    return
+                time.sleep(args.poll_interval)
+
+        # args.clients threads share the client, so endpoint latencies include concurrent requests
+        pipeline_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            job_ids = list(pool.map(submit, range(args.jobs)))
+            list(pool.map(poll, job_ids))
+        pipeline_wall = time.perf_counter() - pipeline_start
+
+        for user_id in user_ids:
+            timed(endpoints, "GET /users/{user_id}", client.get, f"/users/{user_id}")
+            timed(endpoints, "GET /jobs?user_id", client.get, "/jobs", params={"user_id": user_id})
+        timed(endpoints, "GET /jobs", client.get, "/jobs")
+
+        statuses, fallbacks = defaultdict(int), defaultdict(int)
+        for job in client.get("/jobs").json()["jobs"]:
+            statuses[job["status"]] += 1
+            for stage in (job.get("pipeline_metrics") or {}).get("fallbacks", []):
+                fallbacks[stage] += 1
+
+    memory = {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    if args.trace_memory:
+        memory["python_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+
+    return {
+        "config": {
+            "mode": args.mode, "jobs": args.jobs, "users": args.users, "concurrency": args.concurrency,
+            "clients": args.clients,
+            "pages": page_sizes, "llm_latency": args.llm_latency, "search_latency": args.search_latency,
+            "database": "sqlite" if not args.database_url else "external",
+        },
+        "throughput": {
+            "jobs_per_sec": round(len(job_ids) / pipeline_wall, 2) if pipeline_wall else None,
+            "pipeline_wall_sec": round(pipeline_wall, 2),
+            "statuses": dict(statuses),
+            "direct_fallbacks": dict(fallbacks),
+        },
+        "llm": {
+            "calls_per_job": round(statistics.fmean(meter.calls.values()), 2) if meter.calls else 0,
+            "est_tokens_per_job": round(statistics.fmean(meter.tokens.values())) if meter.tokens else 0,
+        },
+        "endpoints": endpoints.summary(),
+        "stages": stages.summary(),
+        "memory": memory,
+    }
+
+
+# Serialization microbenchmark
+
+def run_serialization_benchmark(sizes=(1000, 10000), repeats: int = 3) -> dict:
+    """
+    Encodes in-memory job lists two ways:
+    - pydantic: JobStatusResponse per row, JobListResponse, then revalidated like FastAPI's response_model
+    - fast: main.build_job_payload + serialization.iter_job_list, what GET /jobs does now
+    """
+    import uuid
+    from datetime import datetime, timedelta, timezone
+
+    import main
+    import serialization
+    import task
+    from database import Analysis_Job
+    from schema import JobListResponse, JobStatusResponse
+
+    results = {
+        "verification": json.loads(fake_output(task.Document_Verification_Output)),
+        "financial_analysis": json.loads(fake_output(task.Financial_Analysis_Output)),
+        "investment_analysis": json.loads(fake_output(task.Investment_Analysis_Output)),
+        "risk_assessment": json.loads(fake_output(task.Risk_Assessment_Output)),
+    }
+    created = datetime.now(timezone.utc)
+
+    def pydantic_path(jobs) -> bytes:
+        response = JobListResponse(total=len(jobs), jobs=[
+            JobStatusResponse(
+                **{c.name: getattr(job, c.name) for c in job.__table__.columns},
+                processing_time_seconds=(job.completed_at - job.created_at).total_seconds(),
+            )
+            for job in jobs
+        ])
+        return JobListResponse.model_validate(response.model_dump()).model_dump_json().encode()
+
+    def fast_path(jobs) -> bytes:
+        return b"".join(serialization.iter_job_list(jobs, main.build_job_payload))
+
+    report = {"encoder": "orjson" if serialization.orjson else "json"}
+    for size in sizes:
+        jobs = [
+            Analysis_Job(
+                job_id=uuid.uuid4(), user_id=uuid.uuid4(), filename="synthetic.pdf",
+                query="Summarize revenue and risks", status="completed", priority="normal",
+                attempts=1, created_at=created, completed_at=created + timedelta(seconds=90),
+                error_message=None, pipeline_metrics={"mode": "crew", "total_tokens": 12000},
+                **results,
+            )
+            for _ in range(size)
+        ]
+        row = {}
+        for name, fn in (("pydantic", pydantic_path), ("fast", fast_path)):
+            best = min(timed_once(fn, jobs) for _ in range(repeats))
+            row[f"{name}_ms"] = round(best * 1000, 1)
+        row["speedup"] = round(row["pydantic_ms"] / row["fast_ms"], 1) if row["fast_ms"] else None
+        report[f"{size}_jobs"] = row
+    return report
+
+
+def timed_once(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def print_report(report: dict):
+    print("\n== config ==")
+    for key, value in report["config"].items():
+        print(f"  {key}: {value}")
+    print("\n== throughput ==")
+    for key, value in report["throughput"].items():
+        print(f"  {key}: {value}")
+    for section in ("endpoints", "stages"):
+        print(f"\n== {section} ==")
+        print(f"  {'name':<24}{'count':>7}{'p50 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+        for name, s in report[section].items():
+            print(f"  {name:<24}{s['count']:>7}{s['p50_ms']:>11}{s['p99_ms']:>11}{s['max_ms']:>11}")
+    print("\n== llm ==")
+    for key, value in report["llm"].items():
+        print(f"  {key}: {value}")
+    print("\n== memory ==")
+    for key, value in report["memory"].items():
+        print(f"  {key}: {value}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["crew", "direct"], default="crew", help="PIPELINE_MODE to run")
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="scheduler workers, jobs running in parallel")
+    parser.add_argument("--clients", type=int, default=1,
+                        help="client threads submitting and polling at once, separate from --concurrency")
+    parser.add_argument("--per-user-quota", type=int, default=None, help="defaults to MAX_JOBS_PER_USER")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="seconds between GET /jobs/{job_id} polls")
+    parser.add_argument("--pages", default="1,10,50", help="comma separated page counts of the synthetic PDFs")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="+/- seconds of seeded random jitter")
+    parser.add_argument("--direct-failure-rate", type=float, default=0.0,
+                        help="share of direct-path answers that fail validation and fall back to the agent")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="seconds per fake search call")
+    parser.add_argument("--database-url", default=None, help="defaults to a throwaway sqlite file")
+    parser.add_argument("--trace-memory", action="store_true", help="track python peak memory (slower)")
+    parser.add_argument("--serialization", action="store_true",
+                        help="only run the job list serialization microbenchmark")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    """Must run before config.py is imported"""
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-fake-key")
+    os.environ.setdefault("SERPER_API_KEY", "benchmark-fake-key")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(args.workdir, 'benchmark.db')}"
+    os.environ["UPLOAD_DIR"] = os.path.join(args.workdir, "uploads")
+    os.environ["MAINTENANCE_INTERVAL_SECONDS"] = "0"
+    os.environ["PIPELINE_MODE"] = args.mode
+    os.environ["SCHEDULER_WORKERS"] = str(args.concurrency)
+    os.environ["MAX_QUEUE_DEPTH"] = str(args.jobs + 1)
+    os.environ["MAX_QUEUED_JOBS_PER_USER"] = str(args.jobs + 1)
+    if args.per_user_quota:
+        os.environ["MAX_JOBS_PER_USER"] = str(args.per_user_quota)
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    args.workdir = tempfile.mkdtemp(prefix="fda_bench_")
+    configure_environment(args)
+    try:
+        if args.serialization:
+            report = {"serialization": run_serialization_benchmark()}
+        else:
+            report = run_benchmark(args)
+    finally:
+        shutil.rmtree(args.workdir, ignore_errors=True)
+
+    if args.serialization:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main_cli(sys.argv[1:])
@@ -1,10 +1,42 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Dict, Literal
 import os
 
 class Settings(BaseSettings):
     GOOGLE_API_KEY : str
     SERPER_API_KEY : str
     DATABASE_URL : str
+
+    # where uploads are stored while a job is in flight
+    UPLOAD_DIR : str = "data"
+
+    # job retention and cleanup (see maintenance.py)
+    ARCHIVE_DIR : str = "archive"
+    JOB_RETENTION_DAYS : int = 30               # finished jobs older than this are archived and deleted
+    MAINTENANCE_INTERVAL_SECONDS : int = 3600   # 0 disables the in-process maintenance loop
+    MAINTENANCE_BATCH_SIZE : int = 500
+    STALE_JOB_TIMEOUT_MINUTES : int = 30        # processing jobs started longer ago than this are stuck
+    PENDING_JOB_TIMEOUT_MINUTES : int = 240     # pending jobs older than this are stuck, keep it above the longest
+                                                # queue wait: MAX_QUEUE_DEPTH * AVG_JOB_SECONDS / SCHEDULER_WORKERS
+    MAX_JOB_ATTEMPTS : int = 2                  # stuck jobs are requeued until this many attempts, then failed
+    ORPHAN_FILE_GRACE_MINUTES : int = 60        # unreferenced uploads younger than this are left alone
+
+    # "crew" runs all 4 tasks as agents, "direct" answers verification and risk assessment
+    # with one JSON call each and falls back to the agent when the answer doesn't validate (see fast_path.py)
+    PIPELINE_MODE : Literal["crew", "direct"] = "crew"
+
+    # GET /jobs/{job_id} response caching (see response_cache.py)
+    RESPONSE_CACHE_SIZE : int = 1024            # finished job responses kept in memory, 0 disables
+    JOB_CACHE_MAX_AGE_SECONDS : int = 3600      # Cache-Control max-age for finished jobs
+
+    # job scheduling (see scheduler.py)
+    SCHEDULER_WORKERS : int = 4                 # jobs run in parallel, each builds its own agents and tasks
+    MAX_JOBS_PER_USER : int = 1                 # running at once per user_id, jobs without one count per client address
+    MAX_QUEUED_JOBS_PER_USER : int = 10         # POST /analyze returns 429 to a user with this many jobs waiting
+    MAX_QUEUE_DEPTH : int = 100                 # ... and to everyone once this many jobs are waiting
+    PRIORITY_WEIGHTS : Dict[str, int] = {"high": 4, "normal": 2, "low": 1}
+    AVG_JOB_SECONDS : float = 90.0              # initial ETA per job, refined as jobs finish
+
     model_config = SettingsConfigDict(env_file=".env",extra="ignore")
 
 settings = Settings()
@@ -1,10 +1,9 @@
-from sqlalchemy import Index, create_engine, ForeignKey, Column, String, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Index, create_engine, ForeignKey, Column, String, DateTime, Integer, JSON, Uuid
 import uuid
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timezone
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from config import settings
 
@@ -12,7 +11,13 @@ from config import settings
 class Base(DeclarativeBase):
     pass
 
-engine = create_engine(settings.DATABASE_URL)
+# JSONB on postgres, plain JSON elsewhere (sqlite is used by benchmark.py)
+# Uuid is native UUID on postgres and CHAR(32) elsewhere
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+# sqlite connections are shared with background worker threads
+connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -21,7 +26,7 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 class Users(Base):
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
@@ -33,21 +38,32 @@ class Users(Base):
 class Analysis_Job(Base):
     __tablename__ = "analysis_jobs"
 
-    job_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)  # foreign key
+    job_id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), nullable=True)  # foreign key
     filename = Column(String, nullable=False)
     query = Column(String, nullable=False)
     status = Column(String, default="pending")  # pending / processing / completed / failed
+    priority = Column(String, nullable=False, default="normal", server_default="normal")  # key of settings.PRIORITY_WEIGHTS
+    file_path = Column(String, nullable=True)  # uploaded pdf on disk, removed once the job finishes
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")  # times a worker claimed this job
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime(timezone=True), nullable=True)  # set when a worker marks it processing
     completed_at = Column(DateTime(timezone=True), nullable=True)  # set only when job finishes
-    verification = Column(JSONB, nullable=True)
-    financial_analysis = Column(JSONB, nullable=True)
-    investment_analysis = Column(JSONB, nullable=True)
-    risk_assessment = Column(JSONB, nullable=True)
+    verification = Column(JSONDocument, nullable=True)
+    financial_analysis = Column(JSONDocument, nullable=True)
+    investment_analysis = Column(JSONDocument, nullable=True)
+    risk_assessment = Column(JSONDocument, nullable=True)
     error_message = Column(String, nullable=True)
+    pipeline_metrics = Column(JSONDocument, nullable=True)  # mode, latency and token use of the run
 
     user = relationship("Users", back_populates="jobs")
 
+    # maintenance scans by status + age, see maintenance.py
+    __table_args__ = (
+        Index("ix_analysis_jobs_status_completed_at", "status", "completed_at"),
+        Index("ix_analysis_jobs_status_created_at", "status", "created_at"),
+    )
+
 
 def get_db():
     db = SessionLocal()
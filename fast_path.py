@@ -0,0 +1,184 @@
+"""
+Structured-output fast path.
+
+Verification and risk assessment only need the document text (plus the financial analysis for
+risk) and one structured answer, so in PIPELINE_MODE="direct" they skip the ReAct tool loop:
+the PDF is read once and each of them is a single JSON-mode LLM call validated against its
+output schema. If the answer doesn't validate, that task falls back to its agent.
+Financial analysis and investment analysis keep running as agents.
+"""
+import json
+import time
+from typing import Callable, Optional, Type
+
+from crewai import Crew, Process, Task
+from crewai.tasks.output_format import OutputFormat
+from crewai.tasks.task_output import TaskOutput
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel
+
+from agents import get_json_llm
+from task import create_tasks, Document_Verification_Output, Risk_Assessment_Output
+from tools import load_document_text
+
+
+def output_value(output: Optional[TaskOutput]):
+    """Pydantic output as a dict, raw text if the agent didn't produce valid JSON, else None"""
+    try:
+        return (
+            output.pydantic.model_dump()
+            if output and hasattr(output, "pydantic") and output.pydantic
+            else output.raw if output
+            else None
+        )
+    except Exception:
+        return None
+
+
+def extract_output(task: Task):
+    return output_value(task.output)
+
+
+def new_usage() -> dict:
+    return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "llm_calls": 0}
+
+
+def add_crew_usage(usage: dict, crew: Crew):
+    metrics = getattr(crew, "usage_metrics", None)
+    if metrics:
+        usage["prompt_tokens"] += metrics.prompt_tokens
+        usage["completion_tokens"] += metrics.completion_tokens
+        usage["total_tokens"] += metrics.total_tokens
+        usage["llm_calls"] += metrics.successful_requests
+
+
+def _task_prompt(task: Task, query: str, file_path: str) -> str:
+    # crew kickoff interpolates task.description in place, the template is kept aside by crewai
+    template = getattr(task, "_original_description", None) or task.description
+    return template.format(query=query, file_path=file_path)
+
+
+def run_direct_task(task: Task, output_model: Type[BaseModel], query: str, file_path: str,
+                    document_text: str, usage: dict, context: Optional[str] = None) -> Optional[BaseModel]:
+    """One JSON-mode call for `task`. Returns the validated model, or None so the caller can fall back"""
+    agent = task.agent
+    system = (
+        f"You are a {agent.role}. {agent.backstory}\n"
+        "Answer with a single JSON object that matches this JSON schema, and nothing else:\n"
+        f"{json.dumps(output_model.model_json_schema())}"
+    )
+    human = (
+        f"{_task_prompt(task, query, file_path)}\n\n"
+        "The document has already been read for you, do not ask for tools.\n"
+        f"Expected output: {task.expected_output}\n"
+    )
+    if context:
+        human += f"\nPrevious analysis of this document:\n{context}\n"
+    human += f"\nDocument text:\n{document_text}"
+
+    try:
+        response = get_json_llm().invoke([SystemMessage(content=system), HumanMessage(content=human)])
+    except Exception as e:
+        print(f"Direct {output_model.__name__} call failed: {e}")
+        return None
+
+    usage["llm_calls"] += 1
+    token_usage = getattr(response, "usage_metadata", None) or {}
+    usage["prompt_tokens"] += token_usage.get("input_tokens", 0)
+    usage["completion_tokens"] += token_usage.get("output_tokens", 0)
+    usage["total_tokens"] += token_usage.get("total_tokens", 0)
+
+    text = response.content.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        return output_model.model_validate_json(text)
+    except Exception as e:
+        print(f"Direct {output_model.__name__} did not validate, falling back to the agent: {e}")
+        return None
+
+
+def _direct_task_output(task: Task, result: BaseModel) -> TaskOutput:
+    # the same TaskOutput crewai would have produced for the task
+    return TaskOutput(
+        description=task.description,
+        expected_output=task.expected_output,
+        agent=task.agent.role,
+        raw=result.model_dump_json(),
+        pydantic=result,
+        output_format=OutputFormat.PYDANTIC,
+    )
+
+
+def run_direct_pipeline(query: str, file_path: str, task_callback: Optional[Callable] = None) -> dict:
+    """Same result shape as main.run_crew, with verification and risk assessment done directly"""
+    started = time.perf_counter()
+    usage = new_usage()
+    fallbacks = []
+    results = {}
+    inputs = {"query": query, "file_path": file_path}
+    document_text = load_document_text(file_path)
+    # this job's own agents and tasks, agent fallbacks run on them
+    tasks = create_tasks()
+
+    # 1. verification
+    agent_stages = ["financial_analysis", "investment_analysis"]
+    verification_result = run_direct_task(
+        tasks["verification"], Document_Verification_Output, query, file_path, document_text, usage
+    )
+    if verification_result is None:
+        fallbacks.append("verification")
+        agent_stages.insert(0, "verification")
+    else:
+        results["verification"] = verification_result.model_dump()
+        verification_output = _direct_task_output(tasks["verification"], verification_result)
+        # the analysis task takes verification as context, crewai reads it from the task
+        tasks["verification"].output = verification_output
+        if task_callback:
+            task_callback(verification_output)
+
+    # 2 + 3. financial and investment analysis stay agentic
+    analysis_crew = Crew(
+        agents=[tasks[stage].agent for stage in agent_stages],
+        tasks=[tasks[stage] for stage in agent_stages],
+        process=Process.sequential,
+        verbose=True, task_callback=task_callback,
+    )
+    crew_output = analysis_crew.kickoff(inputs)
+    add_crew_usage(usage, analysis_crew)
+    stage_outputs = dict(zip(agent_stages, crew_output.tasks_output))
+    for stage, output in stage_outputs.items():
+        results[stage] = output_value(output)
+
+    # 4. risk assessment, with the financial analysis as context
+    analysis_output = stage_outputs.get("financial_analysis")
+    risk_result = run_direct_task(
+        tasks["risk_assessment"], Risk_Assessment_Output, query, file_path, document_text, usage,
+        context=analysis_output.raw if analysis_output else None,
+    )
+    if risk_result is None:
+        fallbacks.append("risk_assessment")
+        risk_crew = Crew(
+            agents=[tasks["risk_assessment"].agent], tasks=[tasks["risk_assessment"]],
+            process=Process.sequential, verbose=True, task_callback=task_callback,
+        )
+        risk_output = risk_crew.kickoff(inputs)
+        add_crew_usage(usage, risk_crew)
+        results["risk_assessment"] = output_value(risk_output.tasks_output[0])
+    else:
+        results["risk_assessment"] = risk_result.model_dump()
+        if task_callback:
+            task_callback(_direct_task_output(tasks["risk_assessment"], risk_result))
+
+    return {
+        "verification": results.get("verification"),
+        "financial_analysis": results.get("financial_analysis"),
+        "investment_analysis": results.get("investment_analysis"),
+        "risk_assessment": results.get("risk_assessment"),
+        "metrics": {
+            "mode": "direct",
+            "latency_seconds": round(time.perf_counter() - started, 3),
+            "fallbacks": fallbacks,
+            **usage,
+        },
+    }
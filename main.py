@@ -1,21 +1,32 @@
 import config  
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks, Depends
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID
+import asyncio
+import itertools
 import os
+import time
 import uuid
 
 from passlib.context import CryptContext
 import hashlib
 from crewai import Crew, Process
-from agents import financial_analyst, verifier, investment_advisor, risk_assessor
-from task import verification, analyze_financial_document, investment_analysis, risk_assessment
+from task import create_tasks
+from config import settings
 from database import get_db, init_db, Users, Analysis_Job, SessionLocal
+from fast_path import run_direct_pipeline, extract_output, new_usage, add_crew_usage
+from maintenance import maintenance_loop
+from response_cache import response_cache, make_etag, etag_matches, cache_control, TERMINAL_STATUSES
+from scheduler import scheduler
+from serialization import dumps, job_payload, iter_job_list
 from schema import (
     UserCreate, UserResponse, UserWithJobsResponse,
     JobSubmitResponse, JobStatusResponse, JobListResponse,
@@ -40,13 +51,30 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(normalized)
 
 
-# runs init_db once on start to create tables if they don't exist
+def requeue_job(job: Analysis_Job):
+    """Called by maintenance for stuck jobs that were reset to pending"""
+    scheduler.submit(job.job_id, job.user_id, job.priority, job.query, job.file_path)
+
+
+# runs init_db once on start to create tables if they don't exist,
+# starts the job workers and the periodic job retention / cleanup loop
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
     print("Database ready")
+
+    scheduler.start(process_document_background)
+
+    maintenance_task = None
+    if settings.MAINTENANCE_INTERVAL_SECONDS > 0:
+        maintenance_task = asyncio.create_task(maintenance_loop(requeue=requeue_job))
+
     yield
+
+    if maintenance_task:
+        maintenance_task.cancel()
+    scheduler.stop()
     print("App shutting down.")
 
 
@@ -67,85 +95,115 @@ app.add_middleware(
 )
 
 
-def run_crew(query: str, file_path: str) -> dict:
-    """To run the whole crew"""
+def run_crew(query: str, file_path: str, task_callback=None) -> dict:
+    """
+    To run the whole pipeline. task_callback is called with each TaskOutput as its task finishes.
+    Returns the 4 task outputs plus "metrics" (mode, latency, token use).
+    """
+    if settings.PIPELINE_MODE == "direct":
+        return run_direct_pipeline(query, file_path, task_callback=task_callback)
+
+    started = time.perf_counter()
+    # agents and tasks hold the run's output, so each job gets its own and workers can run in parallel
+    task_map = create_tasks()
     financial_crew = Crew(
-        agents=[verifier, financial_analyst, investment_advisor, risk_assessor],
-        tasks=[verification, analyze_financial_document, investment_analysis, risk_assessment],
+        agents=[task.agent for task in task_map.values()],
+        tasks=list(task_map.values()),
         process=Process.sequential,
         verbose=True,
+        task_callback=task_callback,
     )
 
     financial_crew.kickoff({'query': query, 'file_path': file_path})
 
     # Extract every tasks output individually
-    task_map = {
-        "verification": verification,
-        "financial_analysis": analyze_financial_document,
-        "investment_analysis": investment_analysis,
-        "risk_assessment": risk_assessment,
+    outputs = {key: extract_output(task) for key, task in task_map.items()}
+
+    usage = new_usage()
+    add_crew_usage(usage, financial_crew)
+    outputs["metrics"] = {
+        "mode": "crew",
+        "latency_seconds": round(time.perf_counter() - started, 3),
+        "fallbacks": [],
+        **usage,
     }
-
-    outputs = {}
-    for key, task in task_map.items():
-        try:
-            output = task.output
-            outputs[key] = (
-                output.pydantic.model_dump()
-                if output and hasattr(output, "pydantic") and output.pydantic
-                else output.raw if output
-                else None
-            )
-        except Exception:
-            outputs[key] = None
-
     return outputs
 
 
 
 def process_document_background(job_id: str, query: str, file_path: str):
     """
-    Runs after POST /analyze returns.
+    Runs on a scheduler worker once the job reaches the front of the queue.
     Saves all 4 task outputs to DB.
 
+    The job is claimed with a conditional UPDATE (pending -> processing), so a job queued twice,
+    or by two processes, only runs once. Results are only written while this attempt still owns
+    the job, maintenance may have failed or requeued it in the meantime.
     """
+    job_id = UUID(str(job_id))  # callers hand it over as a string
     db = SessionLocal()
+    attempt, finished = None, False
 
     try:
-        # Mark job as processing
-        job = db.query(Analysis_Job).filter(Analysis_Job.job_id == job_id).first()
-        if not job:
+        # Claim the job
+        claimed = db.query(Analysis_Job).filter(
+            Analysis_Job.job_id == job_id,
+            Analysis_Job.status == "pending",
+        ).update({
+            "status": "processing",
+            "started_at": datetime.now(timezone.utc),
+            "attempts": func.coalesce(Analysis_Job.attempts, 0) + 1,
+        }, synchronize_session=False)
+        db.commit()
+        if not claimed:
             return
+        response_cache.invalidate(job_id)
 
-        job.status = "processing"
-        db.commit()
+        attempt = db.query(Analysis_Job.attempts).filter(Analysis_Job.job_id == job_id).scalar()
+        still_owned = (
+            Analysis_Job.job_id == job_id,
+            Analysis_Job.status == "processing",
+            Analysis_Job.attempts == attempt,
+        )
 
         # Run the full crew
         outputs = run_crew(query=query, file_path=file_path)
 
         # Save all 4 results and mark completed
-        job.status = "completed"
-        job.completed_at = datetime.now(timezone.utc)
-        job.verification = outputs.get("verification")
-        job.financial_analysis = outputs.get("financial_analysis")
-        job.investment_analysis = outputs.get("investment_analysis")
-        job.risk_assessment = outputs.get("risk_assessment")
+        finished = db.query(Analysis_Job).filter(*still_owned).update({
+            "status": "completed",
+            "completed_at": datetime.now(timezone.utc),
+            "verification": outputs.get("verification"),
+            "financial_analysis": outputs.get("financial_analysis"),
+            "investment_analysis": outputs.get("investment_analysis"),
+            "risk_assessment": outputs.get("risk_assessment"),
+            "pipeline_metrics": outputs.get("metrics"),
+        }, synchronize_session=False) > 0
         db.commit()
+        response_cache.invalidate(job_id)
 
     except Exception as e:
         try:
-            job = db.query(Analysis_Job).filter(Analysis_Job.job_id == job_id).first()
-            if job:
-                job.status = "failed"
-                job.error_message = str(e)
-                job.completed_at = datetime.now(timezone.utc)
-                db.commit()
+            db.rollback()
+            if attempt is None:
+                return  # never claimed, or maintenance will find it stuck in processing
+            finished = db.query(Analysis_Job).filter(
+                Analysis_Job.job_id == job_id,
+                Analysis_Job.status == "processing",
+                Analysis_Job.attempts == attempt,
+            ).update({
+                "status": "failed",
+                "error_message": str(e),
+                "completed_at": datetime.now(timezone.utc),
+            }, synchronize_session=False) > 0
+            db.commit()
+            response_cache.invalidate(job_id)
         except Exception:
             pass
 
     finally:
-        # Always clean up file 
-        if os.path.exists(file_path):
+        # Clean up the file once this attempt finished the job, a requeued attempt still needs it
+        if finished and os.path.exists(file_path):
             try:
                 os.remove(file_path)
             except Exception:
@@ -154,15 +212,18 @@ def process_document_background(job_id: str, query: str, file_path: str):
 
 
 
-def build_job_response(job: Analysis_Job) -> JobStatusResponse:
-    processing_time = None
-    if job.completed_at and job.created_at:
-        processing_time = (job.completed_at - job.created_at).total_seconds()
+def build_job_payload(job: Analysis_Job) -> dict:
+    """JobStatusResponse-shaped dict for a job row, encoded with serialization.dumps"""
+    queue_position, eta_seconds = None, None
+    if job.status in ("pending", "processing"):
+        queue_position, eta_seconds = scheduler.queue_info(job.job_id) or (None, None)
+
+    return job_payload(job, queue_position=queue_position, eta_seconds=eta_seconds)
 
-    return JobStatusResponse(
-        **{c.name: getattr(job, c.name) for c in job.__table__.columns},
-        processing_time_seconds=processing_time,
-    )
+
+def json_response(payload: dict) -> Response:
+    # bypasses response_model revalidation, the models stay on the routes for the docs
+    return Response(content=dumps(payload), media_type="application/json")
 
 
 
@@ -202,40 +263,37 @@ def get_user(user_id: UUID, db: Session = Depends(get_db)):
         Analysis_Job.user_id == user_id
     ).order_by(Analysis_Job.created_at.desc()).all()
 
-    return UserWithJobsResponse(
-        id=user.id,
-        email=user.email,
-        name=user.name,
-        created_at=user.created_at,
-        total_jobs=len(jobs),
-        jobs=[build_job_response(job) for job in jobs],
-    )
+    return json_response({
+        "id": user.id,
+        "email": user.email,
+        "name": user.name,
+        "created_at": user.created_at,
+        "total_jobs": len(jobs),
+        "jobs": [build_job_payload(job) for job in jobs],
+    })
 
 
 
 
 @app.post("/analyze", response_model=JobSubmitResponse, status_code=202)
 def analyze_document_endpoint(
-    background_tasks: BackgroundTasks,
+    request: Request,
     file: UploadFile = File(...),
     query: str = Form(default="Analyze this financial document for investment insights"),
     user_id: Optional[str] = Form(default=None),
+    priority: str = Form(default="normal"),
     db: Session = Depends(get_db),
 ):
     """
     Submit a financial document for analysis.
-    Returns immediately (202) with a job_id.
+    Returns immediately (202) with a job_id, or 429 with Retry-After when the user already has
+    MAX_QUEUED_JOBS_PER_USER jobs waiting or the whole queue is full.
     """
-    # Save uploaded file with unique name
-    file_id = str(uuid.uuid4())
-    file_path = f"data/financial_document_{file_id}.pdf"
-    os.makedirs("data", exist_ok=True)
-
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
-
-    if not query or query.strip() == "":
-        query = "Analyze this financial document for investment insights"
+    if priority not in settings.PRIORITY_WEIGHTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"priority must be one of: {', '.join(settings.PRIORITY_WEIGHTS)}",
+        )
 
     # Validate optional user_id
     parsed_user_id = None
@@ -248,6 +306,27 @@ def analyze_document_endpoint(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid user_id format")
 
+    # Admission control before anything is written, jobs without a user are counted per client
+    client = request.client.host if request.client else None
+    retry_after = scheduler.check_admission(parsed_user_id, client)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many jobs queued, try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    # Save uploaded file with unique name
+    file_id = str(uuid.uuid4())
+    file_path = os.path.join(settings.UPLOAD_DIR, f"financial_document_{file_id}.pdf")
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+
+    with open(file_path, "wb") as f:
+        f.write(file.file.read())
+
+    if not query or query.strip() == "":
+        query = "Analyze this financial document for investment insights"
+
     # Create job record 
     job = Analysis_Job(
         job_id=uuid.uuid4(),
@@ -255,17 +334,15 @@ def analyze_document_endpoint(
         filename=file.filename,
         query=query.strip(),
         status="pending",
+        priority=priority,
+        file_path=file_path,
     )
     db.add(job)
     db.commit()
     db.refresh(job)
 
-    background_tasks.add_task(
-        process_document_background,
-        job_id=str(job.job_id),
-        query=query.strip(),
-        file_path=file_path,
-    )
+    scheduler.submit(job.job_id, parsed_user_id, priority, query.strip(), file_path, client=client)
+    queue_position, eta_seconds = scheduler.queue_info(job.job_id) or (None, None)
 
     return JobSubmitResponse(
         job_id=job.job_id,
@@ -273,44 +350,79 @@ def analyze_document_endpoint(
         message="Document submitted. Poll GET /jobs/{job_id} for results.",
         filename=file.filename,
         query=query.strip(),
+        priority=job.priority,
         created_at=job.created_at,
+        queue_position=queue_position,
+        eta_seconds=eta_seconds,
     )
 
 
 @app.get("/jobs/{job_id}", response_model=JobStatusResponse)
-def get_job_status(job_id: UUID, db: Session = Depends(get_db)):
-    """Poll for job status and results"""
-    job = db.query(Analysis_Job).filter(Analysis_Job.job_id == job_id).first()
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+def get_job_status(
+    job_id: UUID,
+    if_none_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    """
+    Poll for job status and results.
+    Finished jobs are served from memory, send the ETag back as If-None-Match to get a 304.
+    """
+    cached = response_cache.get(job_id)
+    if cached:
+        body, etag = cached
+        status = "completed"  # only finished jobs are cached, they share the same headers
+    else:
+        version = response_cache.version()
+        job = db.query(Analysis_Job).filter(Analysis_Job.job_id == job_id).first()
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        payload = build_job_payload(job)
+        body = dumps(payload)
+        etag = make_etag(body)
+        status = job.status
+        if status in TERMINAL_STATUSES:
+            response_cache.put(job_id, body, etag, version)
 
-    return build_job_response(job)
+    headers = {"ETag": etag, "Cache-Control": cache_control(status)}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.get("/jobs", response_model=JobListResponse)
 def list_jobs(
     user_id: Optional[UUID] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
 ):
     """
     List all jobs with optional filters.
     GET /jobs
     GET /jobs?status=completed
     GET /jobs?user_id=...&status=completed
+    Streamed in chunks, rows are read and encoded as they go out.
     """
-    query_filter = db.query(Analysis_Job)
+    # own session, dependencies with yield are closed before a streamed body is sent.
+    # the query runs and the first batch is fetched here, so DB errors still return a 500
+    db = SessionLocal()
+    try:
+        query_filter = db.query(Analysis_Job)
 
-    if user_id:
-        query_filter = query_filter.filter(Analysis_Job.user_id == user_id)
-    if status:
-        query_filter = query_filter.filter(Analysis_Job.status == status)
+        if user_id:
+            query_filter = query_filter.filter(Analysis_Job.user_id == user_id)
+        if status:
+            query_filter = query_filter.filter(Analysis_Job.status == status)
 
-    jobs = query_filter.order_by(Analysis_Job.created_at.desc()).all()
+        rows = iter(query_filter.order_by(Analysis_Job.created_at.desc()).yield_per(500))
+        first_batch = list(itertools.islice(rows, 500))
+    except Exception:
+        db.close()
+        raise
 
-    return JobListResponse(
-        total=len(jobs),
-        jobs=[build_job_response(job) for job in jobs],
+    return StreamingResponse(
+        iter_job_list(itertools.chain(first_batch, rows), build_job_payload),
+        media_type="application/json",
+        background=BackgroundTask(db.close),
     )
 
 
@@ -0,0 +1,201 @@
+"""
+Job retention, archival and file cleanup.
+
+Runs on a timer from the app lifespan, or once from cron with `python maintenance.py`.
+Each run:
+1. fails or requeues jobs stuck in pending / processing (e.g. the server died mid-job)
+2. removes uploaded files that no active job refers to
+3. archives finished jobs older than JOB_RETENTION_DAYS to gzipped JSONL, then deletes them
+"""
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import and_, delete, func, or_
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, Analysis_Job
+from response_cache import response_cache
+
+
+ACTIVE_STATUSES = ("pending", "processing")
+TERMINAL_STATUSES = ("completed", "failed")
+
+# called with a job that was reset to pending and needs a worker again
+RequeueFn = Callable[[Analysis_Job], None]
+
+
+def _remove_file(path: Optional[str]):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
+
+def _serialize_job(job: Analysis_Job) -> dict:
+    """One archive line, every column as plain JSON"""
+    return {c.name: getattr(job, c.name) for c in job.__table__.columns}
+
+
+def recover_stale_jobs(db: Session, now: datetime, requeue: Optional[RequeueFn] = None) -> dict:
+    """
+    Jobs pending longer than PENDING_JOB_TIMEOUT_MINUTES, or processing longer than
+    STALE_JOB_TIMEOUT_MINUTES, are assumed lost. They are requeued while attempts remain and the
+    upload is still on disk, otherwise failed. Each change is conditional on the status and attempt
+    seen here, so a job a worker finishes or claims in the meantime is left alone.
+    """
+    pending_cutoff = now - timedelta(minutes=settings.PENDING_JOB_TIMEOUT_MINUTES)
+    processing_cutoff = now - timedelta(minutes=settings.STALE_JOB_TIMEOUT_MINUTES)
+    stale_jobs = db.query(Analysis_Job).filter(
+        or_(
+            and_(Analysis_Job.status == "pending", Analysis_Job.created_at < pending_cutoff),
+            and_(
+                Analysis_Job.status == "processing",
+                func.coalesce(Analysis_Job.started_at, Analysis_Job.created_at) < processing_cutoff,
+            ),
+        )
+    ).all()
+
+    requeued, failed = [], []
+    for job in stale_jobs:
+        can_retry = (
+            requeue is not None
+            and (job.attempts or 0) < settings.MAX_JOB_ATTEMPTS
+            and job.file_path
+            and os.path.exists(job.file_path)
+        )
+        if can_retry:
+            values = {"status": "pending", "started_at": None}
+        else:
+            values = {
+                "status": "failed",
+                "error_message": f"Job stuck in {job.status} after {job.attempts or 0} attempt(s)",
+                "completed_at": now,
+            }
+
+        changed = db.query(Analysis_Job).filter(
+            Analysis_Job.job_id == job.job_id,
+            Analysis_Job.status == job.status,
+            Analysis_Job.attempts == job.attempts,
+        ).update(values, synchronize_session=False)
+        if changed:
+            (requeued if can_retry else failed).append(job)
+
+    failed_files = [job.file_path for job in failed]
+    changed_ids = [job.job_id for job in requeued + failed]
+    db.commit()
+
+    for path in failed_files:
+        _remove_file(path)
+    for job_id in changed_ids:
+        response_cache.invalidate(job_id)
+
+    # hand back to workers only after the reset is committed
+    for job in requeued:
+        requeue(job)
+
+    return {"requeued": len(requeued), "failed": len(failed)}
+
+
+def sweep_orphaned_uploads(db: Session, now: datetime) -> int:
+    """Delete files in UPLOAD_DIR not referenced by any pending / processing job"""
+    if not os.path.isdir(settings.UPLOAD_DIR):
+        return 0
+
+    active_paths = {
+        os.path.normpath(path)
+        for (path,) in db.query(Analysis_Job.file_path).filter(
+            Analysis_Job.status.in_(ACTIVE_STATUSES),
+            Analysis_Job.file_path.isnot(None),
+        )
+    }
+    # the upload is written before its job row is committed, so leave young files alone
+    grace_cutoff = (now - timedelta(minutes=settings.ORPHAN_FILE_GRACE_MINUTES)).timestamp()
+
+    removed = 0
+    with os.scandir(settings.UPLOAD_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file() or os.path.normpath(entry.path) in active_paths:
+                continue
+            if entry.stat().st_mtime < grace_cutoff:
+                _remove_file(entry.path)
+                removed += 1
+    return removed
+
+
+def archive_old_jobs(db: Session, now: datetime) -> int:
+    """
+    Move finished jobs older than JOB_RETENTION_DAYS into ARCHIVE_DIR/analysis_jobs_<ts>.jsonl.gz.
+    Works in batches of MAINTENANCE_BATCH_SIZE, each batch is written to disk before it is deleted.
+    """
+    cutoff = now - timedelta(days=settings.JOB_RETENTION_DAYS)
+    archive_path = os.path.join(
+        settings.ARCHIVE_DIR, f"analysis_jobs_{now.strftime('%Y%m%dT%H%M%SZ')}.jsonl.gz"
+    )
+
+    archived = 0
+    while True:
+        jobs = db.query(Analysis_Job).filter(
+            Analysis_Job.status.in_(TERMINAL_STATUSES),
+            Analysis_Job.completed_at < cutoff,
+        ).order_by(Analysis_Job.completed_at).limit(settings.MAINTENANCE_BATCH_SIZE).all()
+        if not jobs:
+            break
+
+        os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
+        # every batch appends its own gzip member, readers see one continuous stream
+        with gzip.open(archive_path, "at", encoding="utf-8") as f:
+            for job in jobs:
+                f.write(json.dumps(_serialize_job(job), default=str) + "\n")
+
+        job_ids = [job.job_id for job in jobs]
+        db.execute(
+            delete(Analysis_Job)
+            .where(Analysis_Job.job_id.in_(job_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        db.expunge_all()
+        for job_id in job_ids:
+            response_cache.invalidate(job_id)
+        archived += len(job_ids)
+
+    return archived
+
+
+def run_maintenance(requeue: Optional[RequeueFn] = None) -> dict:
+    """One full maintenance pass, returns counts of what was done"""
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        stats = recover_stale_jobs(db, now, requeue)
+        stats["orphaned_files_removed"] = sweep_orphaned_uploads(db, now)
+        stats["archived"] = archive_old_jobs(db, now)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Maintenance done: {stats}")
+    return stats
+
+
+async def maintenance_loop(requeue: Optional[RequeueFn] = None):
+    """Runs maintenance every MAINTENANCE_INTERVAL_SECONDS until cancelled"""
+    while True:
+        try:
+            await asyncio.to_thread(run_maintenance, requeue)
+        except Exception as e:
+            print(f"Maintenance failed: {e}")
+        await asyncio.sleep(settings.MAINTENANCE_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    # no workers here, stuck jobs are failed instead of requeued
+    run_maintenance()
@@ -0,0 +1,85 @@
+"""
+In-memory LRU of serialized GET /jobs/{job_id} responses, plus ETag helpers.
+
+Only jobs in a terminal state are cached, their content no longer changes. Anything that
+changes or deletes a job calls invalidate() so a stale body is never served, and a body read
+before an invalidation is never stored (see version()).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config import settings
+
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._version = 0   # bumped by every invalidation
+        self._lock = threading.Lock()
+
+    def version(self) -> int:
+        """Take this before reading the row and hand it to put()"""
+        with self._lock:
+            return self._version
+
+    def get(self, job_id) -> Optional[Tuple[bytes, str]]:
+        """(body, etag) or None"""
+        key = str(job_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, job_id, body: bytes, etag: str, version: int):
+        """Stores the body unless something was invalidated since version() was taken"""
+        if self.max_entries <= 0:
+            return
+        key = str(job_id)
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, job_id):
+        with self._lock:
+            self._version += 1
+            self._entries.pop(str(job_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+
+def make_etag(body: bytes) -> str:
+    """Hash of the exact body sent, queue position and ETA included, so a 304 never hides a change"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match can be *, a single tag or a comma separated list, weak tags compare equal"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def cache_control(status: str) -> str:
+    # finished jobs only change when archived, anything else must be revalidated on every poll
+    if status in TERMINAL_STATUSES:
+        return f"max-age={settings.JOB_CACHE_MAX_AGE_SECONDS}"
+    return "no-cache"
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE)
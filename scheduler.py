@@ -0,0 +1,266 @@
+"""
+Priority scheduling and per-user fairness for analysis jobs.
+
+Jobs are queued in memory and run by SCHEDULER_WORKERS worker threads, the database stays the
+source of truth for job status. Dispatch is start-time weighted fair queuing across users:
+- every user_id is one flow, jobs without a user share one flow per client address
+- when a job is queued its flow gets a fixed slot with start tag S = max(V, F of the flow's
+  previous slot) and finish tag F = S + 1 / PRIORITY_WEIGHTS[priority]
+- the slot with the smallest F runs next and V moves up to its S, so a flow that has been
+  waiting keeps its early tags and a busy user can't push everyone else back, whatever priority
+  they pick
+- a flow's slots are filled with its own jobs highest priority first
+- a user never has more than MAX_JOBS_PER_USER jobs running at once
+
+Admission is per flow too: a user with MAX_QUEUED_JOBS_PER_USER jobs waiting gets a 429, so one
+busy user can't fill the whole MAX_QUEUE_DEPTH and lock everyone else out.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from database import SessionLocal, Analysis_Job
+
+
+ANONYMOUS = "anonymous"
+
+# ETAs are rounded up to whole steps, so a polled job's body and ETag don't change every second
+ETA_STEP_SECONDS = 10
+
+
+def flow_key(user_id, client: Optional[str] = None) -> str:
+    """
+    The user_id, else the client address. Anonymous jobs reloaded after a restart have no
+    address and share one flow.
+    """
+    if user_id:
+        return str(user_id)
+    return f"{ANONYMOUS}:{client}" if client else ANONYMOUS
+
+
+def _coarse_eta(seconds: float) -> float:
+    return float(max(0, math.ceil(seconds / ETA_STEP_SECONDS)) * ETA_STEP_SECONDS)
+
+
+class _QueuedJob:
+    __slots__ = ("job_id", "flow_key", "priority", "weight", "seq", "query", "file_path")
+
+    def __init__(self, job_id, flow_key, priority, weight, seq, query, file_path):
+        self.job_id = job_id
+        self.flow_key = flow_key
+        self.priority = priority
+        self.weight = weight
+        self.seq = seq
+        self.query = query
+        self.file_path = file_path
+
+
+class _Flow:
+    __slots__ = ("slots", "jobs", "last_finish", "running")
+
+    def __init__(self):
+        self.slots = deque()                # (start, finish, seq) in tag order
+        self.jobs: List[_QueuedJob] = []    # highest priority first, FIFO within a priority
+        self.last_finish = 0.0
+        self.running = 0
+
+
+class JobScheduler:
+    def __init__(self, workers: int, per_user_limit: int, max_queue_depth: int, max_queued_per_user: int,
+                 priority_weights: Dict[str, int], avg_job_seconds: float):
+        self.workers = workers
+        self.per_user_limit = per_user_limit
+        self.max_queue_depth = max_queue_depth
+        self.max_queued_per_user = max_queued_per_user
+        self.priority_weights = priority_weights
+        self.avg_job_seconds = avg_job_seconds   # moving average of finished jobs, used for ETAs
+
+        self._cond = threading.Condition()
+        self._flows: Dict[str, _Flow] = {}
+        self._vclock = 0.0                                # system virtual time
+        self._running: Dict[str, Tuple[str, float]] = {}  # job_id -> (flow_key, started monotonic)
+        self._tracked = set()
+        self._depth = 0
+        self._seq = 0
+        self._worker_fn: Optional[Callable] = None
+        self._stopping = False
+
+    # lifecycle
+
+    def start(self, worker_fn: Callable):
+        """worker_fn(job_id=, query=, file_path=) runs one job, it is process_document_background"""
+        self._worker_fn = worker_fn
+        self._stopping = False
+        self._load_pending()
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+
+    def stop(self):
+        """Workers exit once their current job is done, queued jobs stay pending in the DB"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def _load_pending(self):
+        # pending jobs from before a restart are picked up again, in submission order.
+        # other processes may queue the same rows, the worker's claim makes sure only one runs them
+        db = SessionLocal()
+        try:
+            jobs = db.query(Analysis_Job).filter(
+                Analysis_Job.status == "pending"
+            ).order_by(Analysis_Job.created_at).all()
+            for job in jobs:
+                if job.file_path and os.path.exists(job.file_path):
+                    self.submit(job.job_id, job.user_id, job.priority, job.query, job.file_path)
+        finally:
+            db.close()
+
+    # submission
+
+    def check_admission(self, user_id, client: Optional[str] = None) -> Optional[int]:
+        """None if the user can queue another job, otherwise the suggested Retry-After in seconds"""
+        with self._cond:
+            flow = self._flows.get(flow_key(user_id, client))
+            if flow and len(flow.jobs) >= self.max_queued_per_user:
+                # until the user's next job starts and frees one of their places
+                ahead = self._projected().index(flow.jobs[0].job_id)
+                return max(1, math.ceil((ahead // self.workers + 1) * self.avg_job_seconds))
+
+            over = self._depth - self.max_queue_depth + 1
+            if over <= 0:
+                return None
+            return max(1, math.ceil(over / self.workers * self.avg_job_seconds))
+
+    def submit(self, job_id, user_id, priority: str, query: str, file_path: str,
+               client: Optional[str] = None) -> bool:
+        """Queue a job, returns False if it is already queued or running"""
+        job_id = str(job_id)
+        key = flow_key(user_id, client)
+        weight = self.priority_weights.get(priority, 1)
+
+        with self._cond:
+            if job_id in self._tracked:
+                return False
+            self._seq += 1
+            job = _QueuedJob(job_id, key, priority, weight, self._seq, query, file_path)
+
+            flow = self._flows.setdefault(key, _Flow())
+            start = max(self._vclock, flow.last_finish)
+            flow.last_finish = start + 1 / weight
+            flow.slots.append((start, flow.last_finish, self._seq))
+
+            index = len(flow.jobs)
+            while index > 0 and flow.jobs[index - 1].weight < weight:
+                index -= 1
+            flow.jobs.insert(index, job)
+
+            self._tracked.add(job_id)
+            self._depth += 1
+            self._cond.notify()
+        return True
+
+    # dispatch
+
+    def _pick(self) -> Optional[_QueuedJob]:
+        """Caller holds the lock. Pops a job for the eligible slot with the smallest finish tag"""
+        best_key, best_slot = None, None
+        for key, flow in self._flows.items():
+            if not flow.jobs or flow.running >= self.per_user_limit:
+                continue
+            slot = flow.slots[0]
+            if best_slot is None or (slot[1], slot[2]) < (best_slot[1], best_slot[2]):
+                best_key, best_slot = key, slot
+
+        if best_key is None:
+            return None
+
+        flow = self._flows[best_key]
+        flow.slots.popleft()
+        job = flow.jobs.pop(0)
+        flow.running += 1
+
+        self._vclock = max(self._vclock, best_slot[0])
+        self._depth -= 1
+        self._running[job.job_id] = (best_key, time.monotonic())
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = None if self._stopping else self._pick()
+                while job is None and not self._stopping:
+                    self._cond.wait()
+                    job = self._pick()
+                if job is None:
+                    return
+
+            started = time.monotonic()
+            try:
+                self._worker_fn(job_id=job.job_id, query=job.query, file_path=job.file_path)
+            except Exception as e:
+                print(f"Job {job.job_id} crashed its worker: {e}")
+            finally:
+                self._finish(job, time.monotonic() - started)
+
+    def _finish(self, job: _QueuedJob, duration: float):
+        with self._cond:
+            self._running.pop(job.job_id, None)
+            self._tracked.discard(job.job_id)
+            self._flows[job.flow_key].running -= 1
+            self.avg_job_seconds = 0.8 * self.avg_job_seconds + 0.2 * duration
+
+            # idle flows whose tags are behind the clock carry no state worth keeping
+            for key in [
+                key for key, flow in self._flows.items()
+                if not flow.jobs and flow.running <= 0 and flow.last_finish <= self._vclock
+            ]:
+                del self._flows[key]
+
+            self._cond.notify_all()
+
+    # status
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return self._depth
+
+    def queue_info(self, job_id) -> Optional[Tuple[int, float]]:
+        """
+        (queue_position, eta_seconds) for a job this scheduler knows about, else None.
+        Position 0 means running, 1 means next in line. Both are estimates, the projection
+        orders the queued slots by finish tag but ignores per-user limits.
+        """
+        job_id = str(job_id)
+        with self._cond:
+            if job_id in self._running:
+                elapsed = time.monotonic() - self._running[job_id][1]
+                return 0, _coarse_eta(self.avg_job_seconds - elapsed)
+            if job_id not in self._tracked:
+                return None
+
+            ahead = self._projected().index(job_id)
+            eta = (ahead // self.workers + 1) * self.avg_job_seconds
+            return ahead + 1, _coarse_eta(eta)
+
+    def _projected(self) -> List[str]:
+        """Caller holds the lock. Queued job ids in expected dispatch order"""
+        projected = []
+        for flow in self._flows.values():
+            for (_, finish, seq), queued in zip(flow.slots, flow.jobs):
+                projected.append((finish, seq, queued.job_id))
+        projected.sort()
+        return [job_id for _, _, job_id in projected]
+
+
+scheduler = JobScheduler(
+    workers=settings.SCHEDULER_WORKERS,
+    per_user_limit=settings.MAX_JOBS_PER_USER,
+    max_queue_depth=settings.MAX_QUEUE_DEPTH,
+    max_queued_per_user=settings.MAX_QUEUED_JOBS_PER_USER,
+    priority_weights=settings.PRIORITY_WEIGHTS,
+    avg_job_seconds=settings.AVG_JOB_SECONDS,
+)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime
 from uuid import UUID
 
@@ -38,7 +38,10 @@ class JobSubmitResponse(BaseModel):
     message: str
     filename: str
     query: str
+    priority: str
     created_at: datetime
+    queue_position: Optional[int] = None                   # 1 = next to run
+    eta_seconds: Optional[float] = None                    # estimated seconds until results are ready
 
 
 class JobStatusResponse(BaseModel):
@@ -48,16 +51,20 @@ class JobStatusResponse(BaseModel):
     filename: str
     query: str
     status: str                                             # pending / processing / completed / failed
+    priority: str = "normal"
     created_at: datetime
     completed_at: Optional[datetime] = None
     processing_time_seconds: Optional[float] = None        # computed from created_at and completed_at
-    # All 4 task outputs 
-    verification: Optional[Document_Verification_Output] = None
-    financial_analysis: Optional[Financial_Analysis_Output] = None
-    investment_analysis: Optional[Investment_Analysis_Output] = None
-    risk_assessment: Optional[Risk_Assessment_Output] = None
+    queue_position: Optional[int] = None                   # only while pending / processing, 0 = running
+    eta_seconds: Optional[float] = None                    # estimated seconds until results are ready
+    # All 4 task outputs, raw text when the agent's answer wasn't valid JSON
+    verification: Optional[Union[Document_Verification_Output, str]] = None
+    financial_analysis: Optional[Union[Financial_Analysis_Output, str]] = None
+    investment_analysis: Optional[Union[Investment_Analysis_Output, str]] = None
+    risk_assessment: Optional[Union[Risk_Assessment_Output, str]] = None
 
     error_message: Optional[str] = None                    # populated only on failure
+    pipeline_metrics: Optional[dict] = None                # mode, latency_seconds, token use, fallbacks
 
     class Config:
         from_attributes = True
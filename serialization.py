@@ -0,0 +1,82 @@
+"""
+Fast JSON serialization for job responses.
+
+Job rows come from our own database and were validated when they were written, so responses
+are built as plain dicts in the JobStatusResponse shape and encoded directly, without going
+through pydantic twice (once building the model, once more in FastAPI's response_model).
+The output is the same JSON pydantic would produce, UTC timestamps end in Z like pydantic's,
+tests/test_serialization.py keeps the two in step.
+Uses orjson when it is installed, the standard json module otherwise.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+from database import Analysis_Job
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if value.utcoffset() == timedelta(0) else text
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_UTC_Z)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def job_payload(job: Analysis_Job, queue_position=None, eta_seconds=None) -> dict:
+    """Same keys as JobStatusResponse, values straight from the row"""
+    processing_time = None
+    if job.completed_at and job.created_at:
+        processing_time = (job.completed_at - job.created_at).total_seconds()
+
+    return {
+        "job_id": job.job_id,
+        "user_id": job.user_id,
+        "filename": job.filename,
+        "query": job.query,
+        "status": job.status,
+        "priority": job.priority,
+        "created_at": job.created_at,
+        "completed_at": job.completed_at,
+        "processing_time_seconds": processing_time,
+        "queue_position": queue_position,
+        "eta_seconds": eta_seconds,
+        "verification": job.verification,
+        "financial_analysis": job.financial_analysis,
+        "investment_analysis": job.investment_analysis,
+        "risk_assessment": job.risk_assessment,
+        "error_message": job.error_message,
+        "pipeline_metrics": job.pipeline_metrics,
+    }
+
+
+def iter_job_list(jobs: Iterable[Analysis_Job], build: Callable[[Analysis_Job], dict],
+                  chunk_size: int = 200) -> Iterator[bytes]:
+    """
+    Encodes {"jobs": [...], "total": n} in chunks so large lists can be streamed.
+    total comes last because it is only known once every row has been read.
+    """
+    yield b'{"jobs":['
+    total, chunk = 0, []
+    for job in jobs:
+        chunk.append(dumps(build(job)))
+        total += 1
+        if len(chunk) == chunk_size:
+            yield (b"," if total > chunk_size else b"") + b",".join(chunk)
+            chunk = []
+    if chunk:
+        yield (b"," if total > len(chunk) else b"") + b",".join(chunk)
+    yield b'],"total":%d}' % total
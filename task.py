@@ -1,9 +1,9 @@
 ## Importing libraries and files
-from crewai import Task
+from crewai import Agent, Task
 from pydantic import BaseModel, Field
-from agents import financial_analyst, verifier, investment_advisor, risk_assessor
+from agents import create_financial_analyst, create_verifier, create_investment_advisor, create_risk_assessor
 from tools import search_tool, read_data_tool
-from typing import List
+from typing import Dict, List
 
 class Document_Verification_Output(BaseModel):
     is_financial_document: bool = Field(description="Whether the file is a valid financial document")
@@ -37,93 +37,112 @@ class Risk_Assessment_Output(BaseModel):
     key_risk_factors: List[str] = Field(description="Specific risk factors identified from the document")
     risk_mitigants: List[str] = Field(description="Risk mitigating factors found in the document")
 
+# A task stores its run's output and its interpolated description on itself, so like the agents
+# they are built per job. create_tasks() wires up one job's agents and tasks.
+
 #VERIFICATION SHOULD BE THE FIRST TASK!
-verification = Task(
-    description=(
-        "Use the Financial Document Reader tool to read the file at: {file_path}\n"
-        "Verify whether this is a legitimate financial document by checking for the presence of:\n"
-        "- Financial statements (income statement, balance sheet, cash flow)\n"
-        "- Numerical financial data (revenue, expenses, assets, liabilities)\n"
-        "- Standard financial reporting sections or disclosures\n"
-        "Report your findings clearly and honestly. If it is not a financial document, say so explicitly."
-    ),
-    expected_output=(
-        "A structured verification report confirming whether the document is a valid financial file, "
-        "what type it is, which financial sections were found, and your confidence level."
-    ),
-    output_pydantic=Document_Verification_Output,
-    agent=verifier,                  
-    tools=[read_data_tool],
-    async_execution=False,
-)
+def create_verification_task(agent: Agent) -> Task:
+    return Task(
+        description=(
+            "Use the Financial Document Reader tool to read the file at: {file_path}\n"
+            "Verify whether this is a legitimate financial document by checking for the presence of:\n"
+            "- Financial statements (income statement, balance sheet, cash flow)\n"
+            "- Numerical financial data (revenue, expenses, assets, liabilities)\n"
+            "- Standard financial reporting sections or disclosures\n"
+            "Report your findings clearly and honestly. If it is not a financial document, say so explicitly."
+        ),
+        expected_output=(
+            "A structured verification report confirming whether the document is a valid financial file, "
+            "what type it is, which financial sections were found, and your confidence level."
+        ),
+        output_pydantic=Document_Verification_Output,
+        agent=agent,                  
+        tools=[read_data_tool],
+        async_execution=False,
+    )
 
 ## Creating a task to help solve user's query
-analyze_financial_document = Task(
-    description=(
-        "Use the Financial Document Reader tool to read the file at: {file_path}\n"
-        "Thoroughly analyze the document to answer the user's query: {query}\n\n"
-        "Your analysis must:\n"
-        "- Be grounded strictly in the document content — do not fabricate or assume data\n"
-        "- Extract specific financial figures, metrics, and trends from the document\n"
-        "- Directly address the user's query with evidence from the document\n"
-        "- Cite the specific sections or pages you are referencing"
-    ),
-    expected_output=(
-        "A structured financial analysis with a document summary, key metrics, identified trends, "
-        "a direct answer to the user's query, and references to the source sections used."
-    ),
-    output_pydantic=Financial_Analysis_Output,
-    agent=financial_analyst,         
-    tools=[read_data_tool, search_tool],
-    async_execution=False,
-    context=[verification], #depends on previous verification task          
-)
+def create_financial_analysis_task(agent: Agent, verification: Task) -> Task:
+    return Task(
+        description=(
+            "Use the Financial Document Reader tool to read the file at: {file_path}\n"
+            "Thoroughly analyze the document to answer the user's query: {query}\n\n"
+            "Your analysis must:\n"
+            "- Be grounded strictly in the document content — do not fabricate or assume data\n"
+            "- Extract specific financial figures, metrics, and trends from the document\n"
+            "- Directly address the user's query with evidence from the document\n"
+            "- Cite the specific sections or pages you are referencing"
+        ),
+        expected_output=(
+            "A structured financial analysis with a document summary, key metrics, identified trends, "
+            "a direct answer to the user's query, and references to the source sections used."
+        ),
+        output_pydantic=Financial_Analysis_Output,
+        agent=agent,         
+        tools=[read_data_tool, search_tool],
+        async_execution=False,
+        context=[verification], #depends on previous verification task          
+    )
 
 ## Creating an investment analysis task
-investment_analysis = Task(
-    description=(
-        "Using the financial analysis already completed for the document at: {file_path}\n"
-        "Provide an objective investment-oriented analysis relevant to: {query}\n\n"
-        "Your analysis must:\n"
-        "- Identify genuine financial strengths and weaknesses from the document data\n"
-        "- Calculate or reference relevant financial ratios present in the document\n"
-        "- Highlight opportunities grounded in the actual financial performance\n"
-        "- Always include a disclaimer that this is informational only, not personalized advice\n"
-        "- Never recommend specific buy/sell actions or speculate beyond the data"
-    ),
-    expected_output=(
-        "A structured investment analysis covering financial strengths, weaknesses, opportunities, "
-        "key ratios, and a compliance disclaimer — all grounded in the document data."
-    ),
-    output_pydantic=Investment_Analysis_Output,
-    agent=investment_advisor,        
-    tools=[read_data_tool],
-    async_execution=False,
-    context=[analyze_financial_document],
-)
+def create_investment_analysis_task(agent: Agent, analysis: Task) -> Task:
+    return Task(
+        description=(
+            "Using the financial analysis already completed for the document at: {file_path}\n"
+            "Provide an objective investment-oriented analysis relevant to: {query}\n\n"
+            "Your analysis must:\n"
+            "- Identify genuine financial strengths and weaknesses from the document data\n"
+            "- Calculate or reference relevant financial ratios present in the document\n"
+            "- Highlight opportunities grounded in the actual financial performance\n"
+            "- Always include a disclaimer that this is informational only, not personalized advice\n"
+            "- Never recommend specific buy/sell actions or speculate beyond the data"
+        ),
+        expected_output=(
+            "A structured investment analysis covering financial strengths, weaknesses, opportunities, "
+            "key ratios, and a compliance disclaimer — all grounded in the document data."
+        ),
+        output_pydantic=Investment_Analysis_Output,
+        agent=agent,        
+        tools=[read_data_tool],
+        async_execution=False,
+        context=[analysis],
+    )
 
 ## Creating a risk assessment task
-risk_assessment = Task(
-    description=(
-        "Using the financial data from the document at: {file_path}\n"
-        "Perform a balanced, evidence-based risk assessment relevant to: {query}\n\n"
-        "Your assessment must:\n"
-        "- Evaluate liquidity, market, and operational risks based strictly on the document\n"
-        "- Assign proportionate risk ratings — do not dramatize or minimize\n"
-        "- Identify specific risk factors mentioned or implied in the financial data\n"
-        "- Identify any risk mitigants or protective factors present in the document\n"
-        "- Follow standard risk assessment principles (do not invent risk frameworks)"
-    ),
-    expected_output=(
-        "A structured risk assessment with an overall risk rating, individual risk category assessments, "
-        "specific risk factors from the document, and identified mitigants."
-    ),
-    output_pydantic=Risk_Assessment_Output,
-    agent=risk_assessor,             
-    tools=[read_data_tool],
-    async_execution=False,
-    context=[analyze_financial_document],
-)
+def create_risk_assessment_task(agent: Agent, analysis: Task) -> Task:
+    return Task(
+        description=(
+            "Using the financial data from the document at: {file_path}\n"
+            "Perform a balanced, evidence-based risk assessment relevant to: {query}\n\n"
+            "Your assessment must:\n"
+            "- Evaluate liquidity, market, and operational risks based strictly on the document\n"
+            "- Assign proportionate risk ratings — do not dramatize or minimize\n"
+            "- Identify specific risk factors mentioned or implied in the financial data\n"
+            "- Identify any risk mitigants or protective factors present in the document\n"
+            "- Follow standard risk assessment principles (do not invent risk frameworks)"
+        ),
+        expected_output=(
+            "A structured risk assessment with an overall risk rating, individual risk category assessments, "
+            "specific risk factors from the document, and identified mitigants."
+        ),
+        output_pydantic=Risk_Assessment_Output,
+        agent=agent,             
+        tools=[read_data_tool],
+        async_execution=False,
+        context=[analysis],
+    )
+
+
+def create_tasks() -> Dict[str, Task]:
+    """Fresh agents and tasks for one job, keyed like the result columns of Analysis_Job"""
+    verification = create_verification_task(create_verifier())
+    analysis = create_financial_analysis_task(create_financial_analyst(), verification)
+    return {
+        "verification": verification,
+        "financial_analysis": analysis,
+        "investment_analysis": create_investment_analysis_task(create_investment_advisor(), analysis),
+        "risk_assessment": create_risk_assessment_task(create_risk_assessor(), analysis),
+    }
 
 #VERIFICATION SHOULD BE THE FIRST TASK!
 # verification = Task(
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# config.py needs these before anything imports it
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.setdefault("SERPER_API_KEY", "test-key")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
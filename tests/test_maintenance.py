@@ -0,0 +1,201 @@
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import maintenance
+from config import settings
+from database import Base, Analysis_Job
+from maintenance import archive_old_jobs, recover_stale_jobs, sweep_orphaned_uploads
+
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    # a file database, so a second session can play a worker racing the maintenance pass
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    os.makedirs(settings.UPLOAD_DIR)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def upload(name: str, age: timedelta = timedelta(0)) -> str:
+    path = os.path.join(settings.UPLOAD_DIR, name)
+    with open(path, "wb") as f:
+        f.write(b"%PDF")
+    mtime = (NOW - age).timestamp()
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def add_job(db, **values) -> uuid.UUID:
+    job = Analysis_Job(job_id=uuid.uuid4(), filename="report.pdf", query="q", **values)
+    db.add(job)
+    db.commit()
+    return job.job_id
+
+
+def status_of(session_factory, job_id):
+    with session_factory() as session:
+        return session.get(Analysis_Job, job_id).status
+
+
+def stuck_processing(attempts: int, file_path: str) -> dict:
+    started = NOW - timedelta(minutes=settings.STALE_JOB_TIMEOUT_MINUTES + 1)
+    return dict(status="processing", attempts=attempts, file_path=file_path,
+                created_at=started, started_at=started)
+
+
+# recover_stale_jobs
+
+def test_stuck_jobs_are_requeued_while_attempts_remain(db, session_factory):
+    requeued = []
+    old_pending = add_job(
+        db, status="pending", attempts=0, file_path=upload("a.pdf"),
+        created_at=NOW - timedelta(minutes=settings.PENDING_JOB_TIMEOUT_MINUTES + 1),
+    )
+    young_pending = add_job(db, status="pending", attempts=0, file_path=upload("b.pdf"), created_at=NOW)
+    stuck = add_job(db, **stuck_processing(1, upload("c.pdf")))
+
+    stats = recover_stale_jobs(db, NOW, requeued.append)
+
+    assert stats == {"requeued": 2, "failed": 0}
+    assert sorted(job.job_id for job in requeued) == sorted([old_pending, stuck])
+    assert status_of(session_factory, stuck) == "pending"
+    assert status_of(session_factory, young_pending) == "pending"
+
+
+def test_jobs_out_of_attempts_are_failed_and_their_upload_removed(db, session_factory):
+    path = upload("a.pdf")
+    job_id = add_job(db, **stuck_processing(settings.MAX_JOB_ATTEMPTS, path))
+    requeued = []
+
+    stats = recover_stale_jobs(db, NOW, requeued.append)
+
+    assert stats == {"requeued": 0, "failed": 1}
+    assert requeued == []
+    assert status_of(session_factory, job_id) == "failed"
+    assert not os.path.exists(path)
+
+
+def test_without_a_requeue_callback_stuck_jobs_are_failed(db, session_factory):
+    job_id = add_job(db, **stuck_processing(0, upload("a.pdf")))
+
+    assert recover_stale_jobs(db, NOW) == {"requeued": 0, "failed": 1}
+    assert status_of(session_factory, job_id) == "failed"
+
+
+@pytest.mark.parametrize("attempts", [0, settings.MAX_JOB_ATTEMPTS], ids=["requeue", "fail"])
+def test_a_worker_finishing_first_wins_the_race(db, session_factory, attempts):
+    path = upload("a.pdf")
+    job_id = add_job(db, **stuck_processing(attempts, path))
+    requeued, raced = [], []
+
+    # the worker completes the job between the stale scan and maintenance's conditional update
+    @event.listens_for(db, "do_orm_execute")
+    def worker_finishes_first(state):
+        if state.is_update and not raced:
+            raced.append(True)
+            with session_factory() as worker:
+                worker.get(Analysis_Job, job_id).status = "completed"
+                worker.commit()
+
+    stats = recover_stale_jobs(db, NOW, requeued.append)
+
+    assert raced
+    assert stats == {"requeued": 0, "failed": 0}
+    assert requeued == []
+    assert status_of(session_factory, job_id) == "completed"
+    assert os.path.exists(path)
+
+
+# sweep_orphaned_uploads
+
+def test_orphaned_uploads_are_removed_after_the_grace_period(db):
+    old = timedelta(minutes=settings.ORPHAN_FILE_GRACE_MINUTES + 1)
+    orphan = upload("orphan.pdf", age=old)
+    young_orphan = upload("young.pdf", age=timedelta(minutes=1))
+    in_use = upload("in_use.pdf", age=old)
+    add_job(db, status="processing", file_path=in_use, created_at=NOW)
+    finished = upload("finished.pdf", age=old)
+    add_job(db, status="completed", file_path=finished, created_at=NOW)
+
+    assert sweep_orphaned_uploads(db, NOW) == 2
+    assert not os.path.exists(orphan)
+    assert not os.path.exists(finished)
+    assert os.path.exists(young_orphan)
+    assert os.path.exists(in_use)
+
+
+# archive_old_jobs
+
+def add_old_finished_jobs(db, count: int) -> list:
+    completed = NOW - timedelta(days=settings.JOB_RETENTION_DAYS + 1)
+    return [
+        add_job(db, status="completed", created_at=completed - timedelta(minutes=i),
+                completed_at=completed - timedelta(minutes=i), verification={"n": i})
+        for i in range(count)
+    ]
+
+
+def archived_ids() -> list:
+    lines = []
+    for name in os.listdir(settings.ARCHIVE_DIR):
+        with gzip.open(os.path.join(settings.ARCHIVE_DIR, name), "rt", encoding="utf-8") as f:
+            lines += [json.loads(line) for line in f]
+    return [line["job_id"] for line in lines]
+
+
+def test_old_finished_jobs_are_archived_in_batches_then_deleted(db, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "MAINTENANCE_BATCH_SIZE", 3)
+    old = add_old_finished_jobs(db, 7)
+    recent = add_job(db, status="completed", created_at=NOW, completed_at=NOW)
+    old_pending = add_job(db, status="pending", created_at=NOW - timedelta(days=90))
+
+    assert archive_old_jobs(db, NOW) == 7
+
+    assert sorted(archived_ids()) == sorted(str(job_id) for job_id in old)
+    with session_factory() as session:
+        remaining = {job.job_id for job in session.query(Analysis_Job)}
+    assert remaining == {recent, old_pending}
+
+
+def test_a_batch_is_only_deleted_once_it_is_on_disk(db, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "MAINTENANCE_BATCH_SIZE", 3)
+    add_old_finished_jobs(db, 7)
+    real_open, calls = gzip.open, []
+
+    def failing_second_batch(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(maintenance.gzip, "open", failing_second_batch)
+
+    with pytest.raises(OSError):
+        archive_old_jobs(db, NOW)
+    db.rollback()
+
+    with session_factory() as session:
+        remaining = {str(job.job_id) for job in session.query(Analysis_Job)}
+    assert len(archived_ids()) == 3
+    assert len(remaining) == 4
+    assert remaining.isdisjoint(archived_ids())
@@ -0,0 +1,37 @@
+from response_cache import ResponseCache, etag_matches, make_etag
+from serialization import dumps
+
+
+def test_put_is_dropped_after_a_concurrent_invalidation():
+    cache = ResponseCache(max_entries=10)
+    version = cache.version()
+    cache.invalidate("job-1")   # a worker changed the job while the request was reading it
+
+    cache.put("job-1", b"old", '"old"', version)
+
+    assert cache.get("job-1") is None
+
+
+def test_put_and_get_roundtrip_and_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    for job_id in ("a", "b"):
+        cache.put(job_id, job_id.encode(), f'"{job_id}"', cache.version())
+    cache.get("a")
+    cache.put("c", b"c", '"c"', cache.version())
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"a", '"a"')
+
+
+def test_etag_changes_with_queue_estimates():
+    payload = {"job_id": "x", "status": "pending", "queue_position": 2, "eta_seconds": 20.0}
+
+    assert make_etag(dumps(payload)) == make_etag(dumps(dict(payload)))
+    assert make_etag(dumps(payload)) != make_etag(dumps(dict(payload, queue_position=1)))
+    assert make_etag(dumps(payload)) != make_etag(dumps(dict(payload, eta_seconds=10.0)))
+
+
+def test_etag_matches_lists_and_weak_tags():
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
@@ -0,0 +1,157 @@
+from scheduler import JobScheduler, ETA_STEP_SECONDS
+
+
+WEIGHTS = {"high": 4, "normal": 2, "low": 1}
+
+
+def make_scheduler(workers=1, per_user_limit=1, max_queue_depth=1000, max_queued_per_user=1000):
+    return JobScheduler(workers, per_user_limit, max_queue_depth, max_queued_per_user, WEIGHTS,
+                        avg_job_seconds=10.0)
+
+
+def dispatch_all(scheduler):
+    """Runs the queue to completion one job at a time, returns job ids in dispatch order"""
+    order = []
+    while True:
+        with scheduler._cond:
+            job = scheduler._pick()
+        if job is None:
+            return order
+        order.append(job.job_id)
+        scheduler._finish(job, 10.0)
+
+
+def dispatch_n(scheduler, n):
+    order = []
+    for _ in range(n):
+        with scheduler._cond:
+            job = scheduler._pick()
+        order.append(job.job_id)
+        scheduler._finish(job, 10.0)
+    return order
+
+
+def test_busy_high_priority_user_does_not_starve_others():
+    scheduler = make_scheduler()
+    for i in range(300):
+        scheduler.submit(f"a{i}", "user-a", "high", "q", "f.pdf")
+    scheduler.submit("b", "user-b", "normal", "q", "f.pdf")
+    scheduler.submit("c", "user-c", "low", "q", "f.pdf")
+
+    order = dispatch_all(scheduler)
+
+    assert len(order) == 302
+    # weights 4 : 2 : 1, so b waits for at most 2 of a's jobs and c for at most 4
+    assert order.index("b") <= 3
+    assert order.index("c") <= 6
+
+
+def test_anonymous_flood_does_not_starve_others():
+    scheduler = make_scheduler()
+    for i in range(300):
+        scheduler.submit(f"anon{i}", None, "normal", "q", "f.pdf")
+    scheduler.submit("b", "user-b", "normal", "q", "f.pdf")
+
+    order = dispatch_all(scheduler)
+
+    assert len(order) == 301
+    assert order.index("b") <= 1
+
+
+def test_late_arrival_is_not_pushed_behind_the_backlog():
+    scheduler = make_scheduler()
+    for i in range(20):
+        scheduler.submit(f"a{i}", "user-a", "high", "q", "f.pdf")
+    first = dispatch_n(scheduler, 10)
+    scheduler.submit("b", "user-b", "low", "q", "f.pdf")
+
+    rest = dispatch_all(scheduler)
+
+    assert len(first) == 10
+    assert rest.index("b") <= 4
+
+
+def test_priority_orders_jobs_within_a_user():
+    scheduler = make_scheduler()
+    scheduler.submit("low", "user-a", "low", "q", "f.pdf")
+    scheduler.submit("normal", "user-a", "normal", "q", "f.pdf")
+    scheduler.submit("high", "user-a", "high", "q", "f.pdf")
+
+    assert dispatch_all(scheduler) == ["high", "normal", "low"]
+
+
+def test_per_user_limit_leaves_workers_for_other_users():
+    scheduler = make_scheduler(workers=2)
+    scheduler.submit("a1", "user-a", "normal", "q", "f.pdf")
+    scheduler.submit("a2", "user-a", "normal", "q", "f.pdf")
+    scheduler.submit("b1", "user-b", "normal", "q", "f.pdf")
+
+    with scheduler._cond:
+        running = [scheduler._pick().job_id, scheduler._pick().job_id]
+        assert scheduler._pick() is None
+
+    assert sorted(running) == ["a1", "b1"]
+
+
+def test_anonymous_jobs_share_a_quota_per_client():
+    scheduler = make_scheduler(workers=3)
+    scheduler.submit("x1", None, "normal", "q", "f.pdf", client="10.0.0.1")
+    scheduler.submit("x2", None, "normal", "q", "f.pdf", client="10.0.0.1")
+    scheduler.submit("y1", None, "normal", "q", "f.pdf", client="10.0.0.2")
+
+    with scheduler._cond:
+        running = [scheduler._pick().job_id, scheduler._pick().job_id]
+        assert scheduler._pick() is None
+
+    assert sorted(running) == ["x1", "y1"]
+
+
+def test_queue_info_matches_dispatch_order():
+    scheduler = make_scheduler()
+    for i in range(5):
+        scheduler.submit(f"a{i}", "user-a", "normal", "q", "f.pdf")
+    scheduler.submit("b", "user-b", "low", "q", "f.pdf")
+
+    positions = {job_id: scheduler.queue_info(job_id)[0] for job_id in ["a0", "a1", "a2", "a3", "a4", "b"]}
+    order = dispatch_all(scheduler)
+
+    assert sorted(positions, key=positions.get) == order
+
+
+def test_eta_is_rounded_up_to_whole_steps():
+    scheduler = JobScheduler(1, 1, 1000, 1000, WEIGHTS, avg_job_seconds=7.0)
+    for i in range(3):
+        scheduler.submit(f"a{i}", f"user-{i}", "normal", "q", "f.pdf")
+
+    etas = [scheduler.queue_info(f"a{i}")[1] for i in range(3)]
+
+    assert etas == [10.0, 20.0, 30.0]
+    assert all(eta % ETA_STEP_SECONDS == 0 for eta in etas)
+
+
+def test_admission_control_reports_retry_after_when_full():
+    scheduler = make_scheduler(max_queue_depth=2)
+    scheduler.submit("a0", "user-a", "normal", "q", "f.pdf")
+    assert scheduler.check_admission("user-b") is None
+
+    scheduler.submit("b0", "user-b", "normal", "q", "f.pdf")
+    assert scheduler.check_admission("user-c") == 10
+
+
+def test_admission_control_is_per_user():
+    scheduler = make_scheduler(max_queue_depth=100, max_queued_per_user=3)
+    scheduler.submit("b0", "user-b", "normal", "q", "f.pdf")
+    for i in range(3):
+        scheduler.submit(f"a{i}", "user-a", "normal", "q", "f.pdf")
+
+    # a0 is second in line behind b0, so a place frees up once it has started
+    assert scheduler.check_admission("user-a") == 20
+    assert scheduler.check_admission("user-b") is None
+    assert scheduler.check_admission(None, "10.0.0.1") is None
+
+
+def test_duplicate_submissions_are_ignored():
+    scheduler = make_scheduler()
+    assert scheduler.submit("a0", "user-a", "normal", "q", "f.pdf")
+    assert not scheduler.submit("a0", "user-a", "normal", "q", "f.pdf")
+    assert dispatch_all(scheduler) == ["a0"]
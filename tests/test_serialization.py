@@ -0,0 +1,74 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database import Analysis_Job
+from schema import JobListResponse, JobStatusResponse
+from serialization import dumps, iter_job_list, job_payload
+from task import Document_Verification_Output, Risk_Assessment_Output
+
+
+CREATED = datetime(2026, 1, 5, 9, 30, 15, 250000, tzinfo=timezone.utc)
+
+
+def make_job(**overrides) -> Analysis_Job:
+    values = dict(
+        job_id=uuid.uuid4(), user_id=uuid.uuid4(), filename="report.pdf", query="Summarize",
+        status="completed", priority="normal", attempts=1,
+        created_at=CREATED, completed_at=CREATED + timedelta(seconds=90),
+        verification=Document_Verification_Output(
+            is_financial_document=True, document_type="10-Q", confidence="high",
+            key_sections_found=["Revenue"], notes="",
+        ).model_dump(),
+        financial_analysis="Final Answer: revenue grew",   # agent answer that wasn't valid JSON
+        investment_analysis=None,
+        risk_assessment=Risk_Assessment_Output(
+            overall_risk_level="Low", liquidity_risk="low", market_risk="medium",
+            operational_risk="low", key_risk_factors=[], risk_mitigants=["cash"],
+        ).model_dump(),
+        error_message=None,
+        pipeline_metrics={"mode": "crew", "total_tokens": 1200, "fallbacks": []},
+    )
+    values.update(overrides)
+    return Analysis_Job(**values)
+
+
+@pytest.mark.parametrize("job", [
+    make_job(),
+    make_job(status="pending", completed_at=None, verification=None, risk_assessment=None,
+             financial_analysis=None, pipeline_metrics=None, user_id=None),
+    make_job(status="failed", error_message="boom", verification="not json either"),
+], ids=["completed", "pending", "failed"])
+def test_job_payload_matches_the_response_model(job):
+    body = dumps(job_payload(job, queue_position=3, eta_seconds=30.0))
+
+    model = JobStatusResponse.model_validate_json(body)
+
+    assert json.loads(model.model_dump_json()) == json.loads(body)
+
+
+def test_utc_timestamps_end_in_z_like_pydantic():
+    body = json.loads(dumps(job_payload(make_job())))
+
+    assert body["created_at"] == "2026-01-05T09:30:15.250000Z"
+
+
+@pytest.mark.parametrize("count", [0, 1, 199, 200, 201, 400, 401])
+def test_iter_job_list_at_chunk_boundaries(count):
+    jobs = [{"n": i} for i in range(count)]
+
+    body = b"".join(iter_job_list(jobs, lambda job: job, chunk_size=200))
+
+    assert json.loads(body) == {"jobs": jobs, "total": count}
+
+
+def test_iter_job_list_matches_the_list_model():
+    jobs = [make_job() for _ in range(3)]
+
+    body = b"".join(iter_job_list(jobs, job_payload, chunk_size=2))
+
+    model = JobListResponse.model_validate_json(body)
+    assert model.total == 3
+    assert json.loads(model.model_dump_json()) == json.loads(body)
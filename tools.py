@@ -9,13 +9,10 @@ from crewai_tools import SerperDevTool
 ## Creating search tool
 search_tool = SerperDevTool()
 
-## Creating custom pdf reader tool
-@tool("Financial Document Reader")
-def read_data_tool(path: str) -> str:
-    """Reads and extracts text content from a financial PDF document.
-    Use this tool to load and parse financial reports, statements, or any PDF file.
-    Args: path: File path to the PDF document.
-    """
+
+## Plain text extraction
+def load_document_text(path: str) -> str:
+    """Extracts the text of a PDF, shared by the reader tool and the direct (no agent) path"""
     loader = PyPDFLoader(file_path=path)
     docs = loader.load()
 
@@ -28,3 +25,13 @@ def read_data_tool(path: str) -> str:
 
     return full_report
 
+
+## Creating custom pdf reader tool
+@tool("Financial Document Reader")
+def read_data_tool(path: str) -> str:
+    """Reads and extracts text content from a financial PDF document.
+    Use this tool to load and parse financial reports, statements, or any PDF file.
+    Args: path: File path to the PDF document.
+    """
+    return load_document_text(path)
+